@@ -26,6 +26,7 @@ class Settings(BaseSettings):
     neo4j_uri: str = Field(default="bolt://neo4j:7687", env="NEO4J_URI")
     neo4j_user: str = Field(default="neo4j", env="NEO4J_USER")
     neo4j_password: str = Field(default="erica_password_123", env="NEO4J_PASSWORD")
+    neo4j_database: str = Field(default="neo4j", env="NEO4J_DATABASE")
     
     # ===========================================
     # ChromaDB Configuration
@@ -4,10 +4,21 @@ HTML parsing, content extraction, and link classification.
 
 import re
 from dataclasses import dataclass, field
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString
 from .utils import normalize_url, classify_url
 
 
+# Boilerplate elements whose text is excluded from page content
+BOILERPLATE_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+
+# Only plain text nodes contribute to content (not comments, doctypes, etc.)
+TEXT_NODE_TYPES = (NavigableString, CData)
+
+CONTENT_CLASS_RE = re.compile(r'content|main|post|article', re.I)
+EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+EXCESS_SPACES_RE = re.compile(r' {2,}')
+
+
 @dataclass
 class ImageInfo:
     """Information extracted about an image."""
@@ -56,9 +67,8 @@ def parse_html(html: str, page_url: str) -> ParsedPage:
     
     links['image'] = [img.url for img in images]
     
-    # Extract main content (create fresh soup to avoid side effects)
-    content_soup = BeautifulSoup(html, 'html.parser')
-    content = extract_content(content_soup)
+    # Extract main content (non-destructive, so the same soup is reused)
+    content = extract_content(soup)
     
     return ParsedPage(
         url=page_url,
@@ -86,16 +96,16 @@ def extract_title(soup: BeautifulSoup) -> str:
 def extract_content(soup: BeautifulSoup) -> str:
     """
     Extract main text content from HTML, removing boilerplate.
-    """
-    # Remove script, style, nav, footer elements
-    for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-        element.decompose()
     
+    Walks the tree once with an explicit stack, skipping boilerplate
+    subtrees in place rather than decomposing them first. The soup
+    is left unmodified.
+    """
     # Try to find main content area
     main_content = (
-        soup.find('main') or 
-        soup.find('article') or 
-        soup.find(class_=re.compile(r'content|main|post|article', re.I)) or
+        soup.find(lambda tag: tag.name == 'main' and not _in_boilerplate(tag)) or
+        soup.find(lambda tag: tag.name == 'article' and not _in_boilerplate(tag)) or
+        soup.find(lambda tag: _has_content_class(tag) and not _in_boilerplate(tag)) or
         soup.find('body')
     )
     
@@ -103,15 +113,38 @@ def extract_content(soup: BeautifulSoup) -> str:
         main_content = soup
     
     # Get text with some structure preserved
-    text = main_content.get_text(separator='\n', strip=True)
+    parts = []
+    stack = [main_content]
+    while stack:
+        node = stack.pop()
+        if type(node) in TEXT_NODE_TYPES:
+            text = node.strip()
+            if text:
+                parts.append(text)
+            continue
+        if node.name is None or node.name in BOILERPLATE_TAGS:
+            continue
+        stack.extend(reversed(node.contents))
+    
+    text = '\n'.join(parts)
     
     # Clean up excessive whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r' {2,}', ' ', text)
+    text = EXCESS_NEWLINES_RE.sub('\n\n', text)
+    text = EXCESS_SPACES_RE.sub(' ', text)
     
     return text.strip()
 
 
+def _in_boilerplate(tag) -> bool:
+    """Check if a tag is, or sits inside, a boilerplate element."""
+    return tag.name in BOILERPLATE_TAGS or tag.find_parent(BOILERPLATE_TAGS) is not None
+
+
+def _has_content_class(tag) -> bool:
+    """Check if any of a tag's classes look like a main content wrapper."""
+    return any(CONTENT_CLASS_RE.search(cls) for cls in tag.get('class', []))
+
+
 def extract_links(soup: BeautifulSoup, page_url: str) -> dict:
     """
     Extract all links from the page and classify them.
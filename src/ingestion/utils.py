@@ -3,9 +3,15 @@ Utility functions for URL normalization, hashing, and domain checking.
 """
 
 import hashlib
+import os
 import re
 from urllib.parse import urlparse, urljoin, urldefrag
 
+# Ada (C++ WHATWG URL parser). Required: normalized URLs are the unique
+# keys in MongoDB and feed url_to_hash, so they must not depend on which
+# parser happens to be installed.
+from ada_url import URL as AdaURL
+
 
 # Base URL for the course - stay within this scope
 ALLOWED_DOMAIN = "pantelis.github.io"
@@ -33,12 +39,26 @@ def normalize_url(url: str, base_url: str = None) -> str:
     - Making it absolute (if base_url provided)
     - Removing fragments (#section)
     - Removing trailing slashes for consistency
-    """
-    if base_url:
-        url = urljoin(base_url, url)
     
-    # Remove fragment
-    url, _ = urldefrag(url)
+    Parses with ada-url (WHATWG rules: lowercased scheme/host, dot
+    segments resolved, percent-encoding applied). Inputs Ada rejects as
+    invalid fall back to urllib.parse, which is deterministic for them.
+    """
+    parsed = None
+    try:
+        parsed = AdaURL(url, base=base_url) if base_url else AdaURL(url)
+    except ValueError:
+        pass
+    
+    if parsed is not None:
+        parsed.hash = ''
+        url = parsed.href
+    else:
+        if base_url:
+            url = urljoin(base_url, url)
+        
+        # Remove fragment
+        url, _ = urldefrag(url)
     
     # Remove trailing slash (except for root)
     if url.endswith('/') and not url.endswith('://'):
@@ -124,6 +144,30 @@ def url_to_hash(url: str) -> str:
     return hashlib.md5(url.encode()).hexdigest()[:12]
 
 
+def atomic_write(path: str | os.PathLike, data: bytes) -> None:
+    """
+    Write bytes to path without Python's buffered IO layer.
+    
+    Writes to a temporary sibling file and renames it into place,
+    so a crash never leaves a partially written file behind.
+    """
+    tmp_path = f"{os.fspath(path)}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+    except BaseException:
+        # Don't leave a partial .tmp behind (e.g. on ENOSPC)
+        os.unlink(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
 def get_file_extension(url: str) -> str:
     """Extract file extension from URL."""
     parsed = urlparse(url)
@@ -2,7 +2,16 @@
 YouTube video transcript extraction.
 """
 
+import asyncio
+import itertools
 import logging
+import threading
+from typing import Iterator
+import requests
+from aiolimiter import AsyncLimiter
+from pymongo import UpdateOne
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import (
     TranscriptsDisabled,
@@ -16,12 +25,58 @@ from .utils import extract_youtube_video_id
 
 logger = logging.getLogger(__name__)
 
+PENDING_VIDEOS = {"resource_type": "video", "status": "pending"}
+PENDING_FIELDS = {"_id": 0, "url": 1, "discovered_from": 1}
+PENDING_BATCH_SIZE = 100
+
+
+def _classify_retrieve_error(error_msg: str) -> str:
+    """Map a CouldNotRetrieveTranscript message to a failure type."""
+    error_msg = error_msg.lower()
+    if "too many requests" in error_msg or "rate limit" in error_msg:
+        return "rate_limit"
+    if "request failed" in error_msg:
+        return "request_failed"
+    return "transcript_error"
+
+
+def _is_transient_error(e: BaseException) -> bool:
+    """Whether a fetch error is worth retrying (rate limits, failed requests)."""
+    return (
+        isinstance(e, CouldNotRetrieveTranscript)
+        and _classify_retrieve_error(str(e)) != "transcript_error"
+    )
+
 
 class YouTubeProcessor:
     """Fetch transcripts from YouTube videos."""
     
-    def __init__(self, storage: Storage):
+    def __init__(
+        self,
+        storage: Storage,
+        write_batch_size: int = 100,
+        requests_per_minute: int = 30,
+        max_content_chars: int | None = None  # None = store full transcripts
+    ):
         self.storage = storage
+        self.write_batch_size = write_batch_size
+        self.max_content_chars = max_content_chars
+        
+        # Shared across concurrent fetches to stay under YouTube's throttling
+        self.rate_limiter = AsyncLimiter(requests_per_minute, 60)
+        
+        # One pooled session for all transcript requests, so videos reuse
+        # connections to youtube.com instead of handshaking each time
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.http_session.mount('https://', adapter)
+        self.ytt_api = YouTubeTranscriptApi(http_client=self.http_session)
+        
+        # Writes queued for the next bulk flush (appended from worker
+        # threads when running async, hence the lock)
+        self._resource_ops: list[UpdateOne] = []
+        self._failure_ops: list[UpdateOne] = []
+        self._ops_lock = threading.Lock()
         
         # Stats
         self.processed = 0
@@ -29,26 +84,109 @@ class YouTubeProcessor:
     
     def process_all_pending(self) -> None:
         """Process all YouTube videos with status 'pending'."""
-        pending = list(self.storage.resources.find({
-            "resource_type": "video",
-            "status": "pending"
-        }))
-        
-        total = len(pending)
+        total = self.storage.resources.count_documents(PENDING_VIDEOS)
         logger.info(f"Processing {total} YouTube videos...")
         
-        for i, doc in enumerate(pending, 1):
+        # Retries can hold a batch past the server's 10-minute idle cursor
+        # timeout, so disable it and close the cursor ourselves
+        pending = self.storage.resources.find(
+            PENDING_VIDEOS, PENDING_FIELDS,
+            batch_size=PENDING_BATCH_SIZE, no_cursor_timeout=True,
+        )
+        
+        try:
+            for i, doc in enumerate(pending, 1):
+                url = doc['url']
+                logger.info(f"[{i}/{total}] {url}")
+                
+                success = self._process_video(url, doc.get('discovered_from'))
+                
+                if success:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+                
+                if len(self._resource_ops) >= self.write_batch_size:
+                    self.flush()
+        finally:
+            pending.close()
+            # Write whatever is queued even if the run is interrupted
+            self.flush()
+        
+        logger.info(f"YouTube processing complete. Success: {self.processed}, Failed: {self.failed}")
+    
+    async def process_all_pending_async(self, concurrency: int = 16) -> None:
+        """
+        Process all pending YouTube videos, fetching up to `concurrency`
+        transcripts at a time.
+        
+        Pending docs are streamed from MongoDB into a bounded queue that
+        `concurrency` workers consume, so fetching starts immediately and
+        only a few batches of docs are held in memory.
+        
+        Usage:
+            asyncio.run(processor.process_all_pending_async())
+        """
+        total = self.storage.resources.count_documents(PENDING_VIDEOS)
+        logger.info(f"Processing {total} YouTube videos ({concurrency} concurrent)...")
+        
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        counter = itertools.count(1)
+        workers = [
+            asyncio.create_task(self._worker(queue, counter, total))
+            for _ in range(concurrency)
+        ]
+        
+        cursor = self.storage.resources.find(
+            PENDING_VIDEOS, PENDING_FIELDS, batch_size=PENDING_BATCH_SIZE
+        )
+        try:
+            while True:
+                # Pull the next cursor batch off the event loop
+                batch = await asyncio.to_thread(
+                    list, itertools.islice(cursor, PENDING_BATCH_SIZE)
+                )
+                if not batch:
+                    break
+                for doc in batch:
+                    await queue.put(doc)
+        finally:
+            cursor.close()
+            for _ in workers:
+                await queue.put(None)
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # Runs after the workers drain, even if one of them raised
+                await asyncio.to_thread(self.flush)
+        
+        logger.info(f"YouTube processing complete. Success: {self.processed}, Failed: {self.failed}")
+    
+    async def _worker(self, queue: asyncio.Queue, counter: Iterator[int], total: int) -> None:
+        """Consume pending video docs from the queue until a None sentinel."""
+        while True:
+            doc = await queue.get()
+            if doc is None:
+                return
+            
             url = doc['url']
-            logger.info(f"[{i}/{total}] {url}")
+            logger.info(f"[{next(counter)}/{total}] {url}")
             
-            success = self.process_video(url, doc.get('discovered_from'))
+            try:
+                success = await self._process_video_async(url, doc.get('discovered_from'))
+            except Exception as e:
+                logger.warning(f"  Unexpected error: {e}")
+                success = False
             
             if success:
                 self.processed += 1
             else:
                 self.failed += 1
-        
-        logger.info(f"YouTube processing complete. Success: {self.processed}, Failed: {self.failed}")
+            
+            if len(self._resource_ops) >= self.write_batch_size:
+                # bulk_write blocks, so run it off the event loop; flush()
+                # swaps the op lists under a lock, so overlapping calls are safe
+                await asyncio.to_thread(self.flush)
     
     def process_video(self, url: str, discovered_from: str = None) -> bool:
         """
@@ -56,37 +194,83 @@ class YouTubeProcessor:
         
         Returns True if successful, False otherwise.
         """
-        # Extract video ID
+        success = self._process_video(url, discovered_from)
+        self.flush()
+        return success
+    
+    def flush(self) -> None:
+        """Write queued resource and failure updates in bulk."""
+        with self._ops_lock:
+            resource_ops, self._resource_ops = self._resource_ops, []
+            failure_ops, self._failure_ops = self._failure_ops, []
+        
+        if resource_ops:
+            self.storage.resources.bulk_write(resource_ops, ordered=False)
+        if failure_ops:
+            self.storage.failures.bulk_write(failure_ops, ordered=False)
+    
+    def close(self) -> None:
+        """Close the pooled HTTP session."""
+        self.http_session.close()
+    
+    def _process_video(self, url: str, discovered_from: str = None) -> bool:
+        """Fetch one transcript, queueing its writes for the next flush."""
+        video_id = self._get_video_id(url, discovered_from)
+        if not video_id:
+            return False
+        
+        transcript_data = self._fetch_transcript(video_id, url)
+        return self._store_transcript(url, discovered_from, video_id, transcript_data)
+    
+    async def _process_video_async(self, url: str, discovered_from: str = None) -> bool:
+        """Async counterpart of _process_video."""
+        video_id = self._get_video_id(url, discovered_from)
+        if not video_id:
+            return False
+        
+        transcript_data = await self._fetch_transcript_async(video_id, url)
+        return self._store_transcript(url, discovered_from, video_id, transcript_data)
+    
+    def _get_video_id(self, url: str, discovered_from: str = None) -> str | None:
+        """Extract the video ID, queueing a failure if the URL has none."""
         video_id = extract_youtube_video_id(url)
         
         if not video_id:
             logger.warning(f"  Could not extract video ID from URL")
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type="parse_error",
                 error_message="Could not extract video ID",
                 discovered_from=discovered_from
             )
-            self.storage.resources.update_one(
-                {"url": url},
-                {"$set": {"status": "failed"}}
-            )
-            return False
-        
-        # Fetch transcript
-        transcript_data = self._fetch_transcript(video_id, url)
+            self._mark_failed(url)
         
+        return video_id
+    
+    def _store_transcript(
+        self,
+        url: str,
+        discovered_from: str,
+        video_id: str,
+        transcript_data: tuple[str, dict] | None
+    ) -> bool:
+        """Queue the resource update for a fetched (or failed) transcript."""
         if transcript_data is None:
-            self.storage.resources.update_one(
-                {"url": url},
-                {"$set": {"status": "failed"}}
-            )
+            self._mark_failed(url)
             return False
         
         transcript_text, metadata = transcript_data
         
-        # Update resource
-        self.storage.save_resource(
+        # Optionally cap stored text before it goes over the wire;
+        # text_length still records the full transcript length
+        truncated = (
+            self.max_content_chars is not None
+            and len(transcript_text) > self.max_content_chars
+        )
+        stored_text = transcript_text[:self.max_content_chars] if truncated else transcript_text
+        
+        # Update resource and store transcript text in one write
+        self._queue_resource_op(self.storage.save_resource_op(
             url=url,
             resource_type="video",
             discovered_from=discovered_from,
@@ -97,19 +281,99 @@ class YouTubeProcessor:
                 "language": metadata.get("language"),
                 "is_auto_generated": metadata.get("is_auto_generated", False),
                 "duration_seconds": metadata.get("duration"),
-                "text_length": len(transcript_text)
-            }
-        )
-        
-        # Store transcript text
-        self.storage.resources.update_one(
-            {"url": url},
-            {"$set": {"content": transcript_text}}
-        )
+                "text_length": len(transcript_text),
+                "content_truncated": truncated
+            },
+            content=stored_text
+        ))
         
         logger.info(f"  Extracted {len(transcript_text)} chars ({metadata.get('language', 'unknown')} language)")
         return True
     
+    def _mark_failed(self, url: str) -> None:
+        """Flip a resource's status to 'failed' (unacknowledged, not queued)."""
+        self.storage.resources_fast.update_one({"url": url}, {"$set": {"status": "failed"}})
+    
+    def _queue_resource_op(self, op: UpdateOne) -> None:
+        """Queue a resources update for the next flush."""
+        with self._ops_lock:
+            self._resource_ops.append(op)
+    
+    def _record_failure(self, **kwargs) -> None:
+        """Queue a failure record (see Storage.record_failure)."""
+        op = self.storage.record_failure_op(**kwargs)
+        with self._ops_lock:
+            self._failure_ops.append(op)
+    
+    async def _fetch_transcript_async(self, video_id: str, url: str) -> tuple[str, dict] | None:
+        """
+        Fetch a transcript without blocking the event loop.
+        
+        youtube-transcript-api is synchronous, so the fetch runs in a
+        worker thread once the shared rate limiter admits it.
+        """
+        async with self.rate_limiter:
+            return await asyncio.to_thread(self._fetch_transcript, video_id, url)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(min=2, max=30),
+        retry=retry_if_exception(_is_transient_error),
+        reraise=True
+    )
+    def _download_transcript(self, video_id: str) -> tuple[str, dict] | None:
+        """
+        List and fetch the best transcript for a video.
+        
+        Rate-limit and request failures are retried with exponential
+        backoff; other errors propagate immediately.
+        
+        Returns (transcript_text, metadata), or None if the video has no
+        transcripts at all.
+        """
+        transcript_list = self.ytt_api.list(video_id)
+        
+        # Single pass, ranked: English manual > English auto-generated >
+        # other manual > other auto-generated
+        transcript_info = None
+        best_rank = None
+        
+        for transcript in transcript_list:
+            is_en = transcript.language_code.startswith('en')
+            rank = (0 if is_en else 2) + (1 if transcript.is_generated else 0)
+            if best_rank is None or rank < best_rank:
+                transcript_info, best_rank = transcript, rank
+                if rank == 0:
+                    break
+        
+        if transcript_info is None:
+            return None
+        
+        language = transcript_info.language_code
+        is_auto = transcript_info.is_generated
+        
+        # Fetch the transcript content
+        transcript_data = transcript_info.fetch()
+        
+        # Combine snippets into full text
+        text_parts = [entry.text for entry in transcript_data]
+        full_text = ' '.join(text_parts)
+        
+        # Calculate duration from last entry
+        duration = None
+        if transcript_data:
+            last_entry = transcript_data[-1]
+            duration = int(last_entry.start + last_entry.duration)
+        
+        metadata = {
+            "language": language,
+            "is_auto_generated": is_auto,
+            "duration": duration,
+            "segment_count": len(transcript_data)
+        }
+        
+        return full_text, metadata
+    
     def _fetch_transcript(self, video_id: str, url: str) -> tuple[str, dict] | None:
         """
         Fetch transcript from YouTube using youtube-transcript-api.
@@ -117,80 +381,22 @@ class YouTubeProcessor:
         Returns (transcript_text, metadata) or None if failed.
         """
         try:
-            ytt_api = YouTubeTranscriptApi()
-            transcript_list = ytt_api.list(video_id)
-            
-            transcript_info = None
-            is_auto = False
-            language = None
-            
-            available_transcripts = list(transcript_list)
-            
-            for transcript in available_transcripts:
-                if transcript.language_code.startswith('en') and not transcript.is_generated:
-                    transcript_info = transcript
-                    language = transcript.language_code
-                    is_auto = False
-                    break
-            
-            if transcript_info is None:
-                for transcript in available_transcripts:
-                    if transcript.language_code.startswith('en') and transcript.is_generated:
-                        transcript_info = transcript
-                        language = transcript.language_code
-                        is_auto = True
-                        break
+            transcript = self._download_transcript(video_id)
             
-            if transcript_info is None:
-                try:
-                    transcript_info = transcript_list.find_manually_created_transcript(['en'])
-                    language = transcript_info.language_code
-                    is_auto = False
-                except:
-                    try:
-                        transcript_info = transcript_list.find_generated_transcript(['en'])
-                        language = transcript_info.language_code
-                        is_auto = True
-                    except:
-                        if available_transcripts:
-                            transcript_info = available_transcripts[0]
-                            language = transcript_info.language_code
-                            is_auto = transcript_info.is_generated
-            
-            if transcript_info is None:
+            if transcript is None:
                 logger.warning(f"  No transcript available")
-                self.storage.record_failure(
+                self._record_failure(
                     url=url,
                     failure_type="no_transcript",
                     error_message="No transcript available"
                 )
                 return None
             
-            # Fetch the transcript content
-            transcript_data = transcript_info.fetch()
-            
-            # Combine snippets into full text
-            text_parts = [entry.text for entry in transcript_data]
-            full_text = ' '.join(text_parts)
-            
-            # Calculate duration from last entry
-            duration = None
-            if transcript_data:
-                last_entry = transcript_data[-1]
-                duration = int(last_entry.start + last_entry.duration)
-            
-            metadata = {
-                "language": language,
-                "is_auto_generated": is_auto,
-                "duration": duration,
-                "segment_count": len(transcript_data)
-            }
-            
-            return full_text, metadata
+            return transcript
             
         except TranscriptsDisabled:
             logger.warning(f"  Transcripts disabled for this video")
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type="transcripts_disabled",
                 error_message="Transcripts are disabled for this video"
@@ -198,7 +404,7 @@ class YouTubeProcessor:
             return None
         except NoTranscriptFound:
             logger.warning(f"  No transcript found for this video")
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type="no_transcript",
                 error_message="No transcript found for this video"
@@ -206,7 +412,7 @@ class YouTubeProcessor:
             return None
         except VideoUnavailable:
             logger.warning(f"  Video unavailable")
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type="video_unavailable",
                 error_message="Video is unavailable"
@@ -214,17 +420,15 @@ class YouTubeProcessor:
             return None
         except CouldNotRetrieveTranscript as e:
             error_msg = str(e)
-            if "too many requests" in error_msg.lower() or "rate limit" in error_msg.lower():
+            failure_type = _classify_retrieve_error(error_msg)
+            if failure_type == "rate_limit":
                 logger.warning(f"  Too many requests to YouTube")
-                failure_type = "rate_limit"
-            elif "request failed" in error_msg.lower():
+            elif failure_type == "request_failed":
                 logger.warning(f"  YouTube request failed: {error_msg}")
-                failure_type = "request_failed"
             else:
                 logger.warning(f"  Could not retrieve transcript: {error_msg}")
-                failure_type = "transcript_error"
             
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type=failure_type,
                 error_message=error_msg
@@ -233,7 +437,7 @@ class YouTubeProcessor:
         except Exception as e:
             error_msg = str(e)
             logger.warning(f"  Unexpected error: {error_msg}")
-            self.storage.record_failure(
+            self._record_failure(
                 url=url,
                 failure_type="transcript_error",
                 error_message=error_msg
@@ -249,4 +453,5 @@ def process_youtube(
     storage = Storage(mongo_uri=mongo_uri, db_name=db_name)
     processor = YouTubeProcessor(storage=storage)
     processor.process_all_pending()
+    processor.close()
     storage.close()
\ No newline at end of file
@@ -2,9 +2,11 @@
 Erica AI Tutor - LLM Client
 Supports OpenRouter API with Qwen2.5 models
 """
+import asyncio
 import os
 from typing import Optional, List, Dict, Any
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI, OpenAI
 from pydantic import BaseModel
 
 from config import settings
@@ -44,6 +46,10 @@ class LLMClient:
             api_key=self.api_key,
             base_url=self.base_url,
         )
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+        )
     
     def chat(
         self,
@@ -72,6 +78,58 @@ class LLMClient:
         )
         return response.choices[0].message.content
     
+    async def chat_async(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> str:
+        """
+        Async version of chat().
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Sampling temperature (0-2)
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Generated text response
+        """
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        return response.choices[0].message.content
+    
+    async def chat_many(
+        self,
+        list_of_messages: List[List[Dict[str, str]]],
+        concurrency: int = 20,
+        **kwargs
+    ) -> List[str]:
+        """
+        Run many chat requests concurrently.
+        
+        Args:
+            list_of_messages: One message list per request
+            concurrency: Maximum requests in flight at once
+            **kwargs: Passed through to chat_async()
+            
+        Returns:
+            Responses in the same order as list_of_messages
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one(messages: List[Dict[str, str]]) -> str:
+            async with semaphore:
+                return await self.chat_async(messages, **kwargs)
+        
+        return await asyncio.gather(*(one(m) for m in list_of_messages))
+    
     def generate(
         self,
         prompt: str,
@@ -132,17 +190,31 @@ Return a JSON object with:
 
 JSON:"""
 
-        response = self.generate(prompt, system_prompt=system_prompt, temperature=0.3)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        
+        # JSON mode makes the whole response a JSON object
+        response = self.chat(
+            messages,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+        
+        try:
+            return orjson.loads(response)
+        except orjson.JSONDecodeError:
+            pass
         
-        # Try to parse JSON from response
-        import json
+        # Fall back to locating JSON in the response, for models that
+        # ignore response_format and wrap it in extra text
         try:
-            # Find JSON in response (it might have extra text)
             start = response.find('{')
             end = response.rfind('}') + 1
             if start != -1 and end > start:
-                return json.loads(response[start:end])
-        except json.JSONDecodeError:
+                return orjson.loads(response[start:end])
+        except orjson.JSONDecodeError:
             pass
         
         return {"entities": [], "relationships": [], "raw_response": response}
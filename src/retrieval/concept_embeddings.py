@@ -12,9 +12,12 @@ Usage:
 """
 
 import chromadb
+import numpy as np
+import torch
 from pymongo import MongoClient
 from sentence_transformers import SentenceTransformer
 from typing import Optional
+import functools
 import hashlib
 
 
@@ -29,6 +32,9 @@ class ConceptEmbedder:
         db_name: str = "erica",
         collection_name: str = "concepts",
         embedding_model: str = "all-MiniLM-L6-v2",
+        device: Optional[str] = None,
+        quantize_cpu: bool = False,
+        query_cache_size: int = 1024,
     ):
         # MongoDB connection
         self.mongo_client = MongoClient(mongo_uri)
@@ -38,10 +44,25 @@ class ConceptEmbedder:
         self.chroma_client = chromadb.HttpClient(host=chroma_host, port=chroma_port)
         self.collection_name = collection_name
         
-        # Embedding model (runs locally)
-        print(f"Loading embedding model: {embedding_model}...")
-        self.model = SentenceTransformer(embedding_model)
+        # Embedding model (runs locally): FP16 on GPU, optionally
+        # dynamically int8-quantized on CPU
+        device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        print(f"Loading embedding model: {embedding_model} ({device})...")
+        self.model = SentenceTransformer(embedding_model, device=device)
+        if device.startswith("cuda"):
+            self.model.half()
+        elif quantize_cpu:
+            self.model[0].auto_model = torch.quantization.quantize_dynamic(
+                self.model[0].auto_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
         print(f"Model loaded. Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
+        
+        # Per-instance LRU of query embeddings (repeat questions skip the model)
+        self._embed_query_cached = functools.lru_cache(maxsize=query_cache_size)(self._embed_query)
+    
+    def _embed_query(self, query: str) -> tuple[float, ...]:
+        """Embed a single query string."""
+        return tuple(self.model.encode(query, normalize_embeddings=True).tolist())
     
     def _get_or_create_collection(self, clear_existing: bool = False):
         """Get or create the ChromaDB collection."""
@@ -54,7 +75,10 @@ class ConceptEmbedder:
         
         collection = self.chroma_client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"description": "Concept embeddings for semantic search"}
+            metadata={
+                "description": "Concept embeddings for semantic search",
+                "hnsw:space": "cosine",
+            }
         )
         return collection
     
@@ -75,68 +99,141 @@ class ConceptEmbedder:
     
     def _generate_id(self, title: str) -> str:
         """Generate a stable ID from concept title."""
-        return hashlib.md5(title.encode()).hexdigest()[:16]
+        return hashlib.blake2b(title.encode(), digest_size=8).hexdigest()
     
-    def embed_all_concepts(self, clear_existing: bool = True, batch_size: int = 100):
+    def _content_hash(self, text: str) -> str:
+        """Hash of the text an embedding was computed from."""
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    
+    def embed_all_concepts(
+        self,
+        clear_existing: bool = True,
+        batch_size: int = 100,
+        encode_batch_size: int = 256,
+    ):
         """
         Embed all concepts from MongoDB into ChromaDB.
         
+        All concept texts go through a single encode call, so the model's
+        own batching covers the whole corpus; ChromaDB reads and writes
+        are then chunked.
+        
+        Each embedding stores a hash of its source text, so when not
+        clearing, concepts whose text is unchanged are not re-encoded
+        (only their metadata is refreshed).
+        
         Args:
             clear_existing: Whether to clear existing embeddings
-            batch_size: Number of concepts to embed at once
+            batch_size: Number of concepts per ChromaDB request
+            encode_batch_size: Batch size for the embedding model
         """
         collection = self._get_or_create_collection(clear_existing=clear_existing)
         
-        # Fetch all concepts from MongoDB
-        concepts = list(self.db.concepts.find({}))
-        print(f"Found {len(concepts)} concepts in MongoDB")
+        # Stream concepts from MongoDB, fetching only the embedded fields,
+        # and keep just the prepared text/metadata rather than whole docs
+        cursor = self.db.concepts.find(
+            {},
+            projection={
+                "_id": 0,
+                "title": 1,
+                "definition": 1,
+                "aliases": 1,
+                "difficulty": 1,
+                "mention_count": 1,
+            },
+            batch_size=500,
+        )
         
-        # Process in batches
-        total_embedded = 0
+        ids = []
+        texts = []
+        metadatas = []
         
-        for i in range(0, len(concepts), batch_size):
-            batch = concepts[i:i + batch_size]
+        for concept in cursor:
+            title = concept.get("title", "")
+            if not title:
+                continue
             
-            # Prepare batch data
-            ids = []
-            texts = []
-            metadatas = []
+            concept_id = self._generate_id(title)
+            text = self._concept_to_text(concept)
             
-            for concept in batch:
-                title = concept.get("title", "")
-                if not title:
-                    continue
+            ids.append(concept_id)
+            texts.append(text)
+            metadatas.append({
+                "title": title,
+                "definition": concept.get("definition", "")[:500],  # Truncate for metadata
+                "difficulty": concept.get("difficulty", "unknown"),
+                "mention_count": concept.get("mention_count", 0),
+                "content_hash": self._content_hash(text),
+            })
+        
+        print(f"Found {len(ids)} concepts in MongoDB")
+        
+        # Drop embeddings for concepts that no longer exist (or were stored
+        # under an older ID scheme)
+        if not clear_existing:
+            stale_ids = list(set(collection.get(include=[])["ids"]) - set(ids))
+            for i in range(0, len(stale_ids), batch_size):
+                collection.delete(ids=stale_ids[i:i + batch_size])
+            if stale_ids:
+                print(f"Removed {len(stale_ids)} stale embeddings")
+        
+        # Skip concepts whose embedded text hasn't changed
+        total_skipped = 0
+        if not clear_existing and ids:
+            changed = []
+            for i in range(0, len(ids), batch_size):
+                batch_ids = ids[i:i + batch_size]
+                existing = collection.get(ids=batch_ids, include=["metadatas"])
+                existing_meta = dict(zip(existing["ids"], existing["metadatas"]))
                 
-                concept_id = self._generate_id(title)
-                text = self._concept_to_text(concept)
+                stale_meta = []
+                for j in range(i, i + len(batch_ids)):
+                    old_meta = existing_meta.get(ids[j])
+                    if not old_meta or old_meta.get("content_hash") != metadatas[j]["content_hash"]:
+                        changed.append(j)
+                    elif old_meta != metadatas[j]:
+                        stale_meta.append(j)
                 
-                ids.append(concept_id)
-                texts.append(text)
-                metadatas.append({
-                    "title": title,
-                    "definition": concept.get("definition", "")[:500],  # Truncate for metadata
-                    "difficulty": concept.get("difficulty", "unknown"),
-                    "mention_count": concept.get("mention_count", 0),
-                })
+                if stale_meta:
+                    collection.update(
+                        ids=[ids[j] for j in stale_meta],
+                        metadatas=[metadatas[j] for j in stale_meta],
+                    )
             
-            if not ids:
-                continue
-            
-            # Generate embeddings
-            embeddings = self.model.encode(texts, show_progress_bar=False).tolist()
-            
-            # Add to ChromaDB
-            collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
+            total_skipped = len(ids) - len(changed)
+            ids = [ids[j] for j in changed]
+            texts = [texts[j] for j in changed]
+            metadatas = [metadatas[j] for j in changed]
+        
+        if not ids:
+            print(f"\nDone! 0 concepts embedded ({total_skipped} unchanged, skipped)")
+            return 0
+        
+        # Generate all embeddings in one pass, kept as a float32 ndarray
+        # (ChromaDB accepts arrays, so no per-float Python objects)
+        embeddings = self.model.encode(
+            texts,
+            batch_size=encode_batch_size,
+            show_progress_bar=True,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32, copy=False)
+        
+        # Add to ChromaDB in chunks (upsert so changed concepts replace old vectors)
+        total_embedded = 0
+        for i in range(0, len(ids), batch_size):
+            collection.upsert(
+                ids=ids[i:i + batch_size],
+                embeddings=embeddings[i:i + batch_size],
+                documents=texts[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size],
             )
             
-            total_embedded += len(ids)
-            print(f"  Embedded {total_embedded}/{len(concepts)} concepts")
+            total_embedded += len(ids[i:i + batch_size])
+            print(f"  Stored {total_embedded}/{len(ids)} embeddings")
         
-        print(f"\nDone! {total_embedded} concepts embedded into ChromaDB collection '{self.collection_name}'")
+        print(f"\nDone! {total_embedded} concepts embedded into ChromaDB collection '{self.collection_name}'"
+              f" ({total_skipped} unchanged, skipped)")
         return total_embedded
     
     def search(
@@ -144,6 +241,7 @@ class ConceptEmbedder:
         query: str,
         top_k: int = 10,
         min_score: Optional[float] = None,
+        return_full_text: bool = False,
     ) -> list[dict]:
         """
         Search for concepts similar to the query.
@@ -151,47 +249,121 @@ class ConceptEmbedder:
         Args:
             query: User question or search text
             top_k: Number of results to return
-            min_score: Minimum similarity score (0-1, higher is more similar)
+            min_score: Minimum cosine similarity (higher is more similar)
+            return_full_text: Also fetch the embedded text ('full_text');
+                off by default to keep ChromaDB responses small
         
         Returns:
             List of dicts with 'title', 'definition', 'difficulty', 'score'
+            (and 'full_text' if requested)
         """
         collection = self.chroma_client.get_collection(self.collection_name)
         
-        # Embed the query
-        query_embedding = self.model.encode(query).tolist()
+        # Embed the query (cached by exact, whitespace-stripped text)
+        query_embedding = list(self._embed_query_cached(query.strip()))
         
         # Search ChromaDB
+        include = ["metadatas", "distances"]
+        if return_full_text:
+            include.append("documents")
+        
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
-            include=["metadatas", "distances", "documents"],
+            include=include,
+        )
+        
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        return self._format_results(results, 0, space, min_score, return_full_text)
+    
+    def search_batch(
+        self,
+        queries: list[str],
+        top_k: int = 10,
+        min_score: Optional[float] = None,
+        return_full_text: bool = False,
+    ) -> list[list[dict]]:
+        """
+        Search for several queries at once.
+        
+        All queries are embedded in one model forward pass and sent to
+        ChromaDB in a single request. Arguments match search().
+        
+        Returns:
+            One result list per query, in input order
+        """
+        if not queries:
+            return []
+        
+        collection = self.chroma_client.get_collection(self.collection_name)
+        
+        query_embeddings = self.model.encode(
+            [query.strip() for query in queries],
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype(np.float32)
+        
+        include = ["metadatas", "distances"]
+        if return_full_text:
+            include.append("documents")
+        
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            include=include,
         )
         
-        # Format results
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        return [
+            self._format_results(results, q, space, min_score, return_full_text)
+            for q in range(len(queries))
+        ]
+    
+    def _format_results(
+        self,
+        results: dict,
+        query_index: int,
+        space: str,
+        min_score: Optional[float],
+        return_full_text: bool,
+    ) -> list[dict]:
+        """Turn one query's slice of a ChromaDB response into match dicts."""
         formatted = []
-        for i, (meta, distance, doc) in enumerate(zip(
-            results["metadatas"][0],
-            results["distances"][0],
-            results["documents"][0],
+        for i, (meta, distance) in enumerate(zip(
+            results["metadatas"][query_index],
+            results["distances"][query_index],
         )):
-            # ChromaDB returns L2 distance by default; convert to similarity score
-            # Lower distance = more similar
-            score = 1 / (1 + distance)
+            score = self._distance_to_similarity(distance, space)
             
             if min_score and score < min_score:
                 continue
             
-            formatted.append({
+            match = {
                 "title": meta["title"],
                 "definition": meta["definition"],
                 "difficulty": meta["difficulty"],
                 "score": round(score, 4),
-                "full_text": doc,
-            })
+            }
+            if return_full_text:
+                match["full_text"] = results["documents"][query_index][i]
+            
+            formatted.append(match)
         
         return formatted
     
+    @staticmethod
+    def _distance_to_similarity(distance: float, space: str) -> float:
+        """
+        Convert a ChromaDB distance to cosine similarity.
+        
+        Embeddings are unit-normalized, so cosine distance is 1 - cos and
+        squared L2 distance (collections created before the switch to
+        cosine) is 2 - 2 * cos.
+        """
+        if space == "cosine":
+            return 1 - distance
+        return 1 - distance / 2
+    
     def get_stats(self) -> dict:
         """Get statistics about the ChromaDB collection."""
         try:
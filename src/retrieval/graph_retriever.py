@@ -14,12 +14,165 @@ Usage:
     subgraph = retriever.expand_seeds(["Gradient Descent", "Backpropagation"])
 """
 
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import orjson
 from neo4j import GraphDatabase
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 from dataclasses import dataclass, field
 
+# Orderings that needed a Neo4j edge lookup are cached per concept list
+TOPOSORT_CACHE_SIZE = 512
 
-@dataclass
+# Every expansion starts from title/url lookups; the uniqueness constraints
+# (same names as the graph build notebook) give them an index seek
+SCHEMA_STATEMENTS = {
+    "concept_title": "CREATE CONSTRAINT concept_title IF NOT EXISTS "
+                     "FOR (c:Concept) REQUIRE c.title IS UNIQUE",
+    "resource_url": "CREATE CONSTRAINT resource_url IF NOT EXISTS "
+                    "FOR (r:Resource) REQUIRE r.url IS UNIQUE",
+}
+
+# Whole seed expansion in one statement. Seeds are resolved once;
+# prerequisites, related concepts and the longest prereq chain are
+# correlated subqueries per seed. Candidates are deduplicated and limited
+# before resources, examples and PREREQ_OF edges are fetched for them.
+EXPANSION_QUERY = """
+UNWIND $titles AS seedTitle
+MATCH (seed:Concept {title: seedTitle})
+CALL {
+    WITH seed, seedTitle
+    CALL apoc.path.expandConfig(seed, {
+        relationshipFilter: '<PREREQ_OF',
+        labelFilter: '>Concept',
+        minLevel: 1,
+        maxLevel: $prereq_depth,
+        uniqueness: 'NODE_GLOBAL'
+    }) YIELD path
+    WITH seedTitle, last(nodes(path)) AS prereq, length(path) AS depth
+    ORDER BY depth
+    RETURN collect({
+        title: prereq.title,
+        definition: prereq.definition,
+        difficulty: prereq.difficulty,
+        depth: depth,
+        relation: 'prerequisite',
+        seed_concept: seedTitle
+    }) AS seed_prereqs
+}
+CALL {
+    WITH seed, seedTitle
+    CALL apoc.path.expandConfig(seed, {
+        relationshipFilter: 'IS_A|PART_OF|SIBLING|CONTRASTS_WITH',
+        labelFilter: '>Concept',
+        minLevel: 1,
+        maxLevel: $related_depth,
+        uniqueness: 'RELATIONSHIP_PATH'
+    }) YIELD path
+    WITH seedTitle,
+         last(nodes(path)) AS related,
+         type(relationships(path)[0]) AS rel_type
+    WHERE related.title <> seedTitle
+    WITH DISTINCT seedTitle, related, rel_type
+    RETURN collect({
+        title: related.title,
+        definition: related.definition,
+        difficulty: related.difficulty,
+        depth: 1,
+        relation: toLower(rel_type),
+        seed_concept: seedTitle
+    }) AS seed_related
+}
+CALL {
+    WITH seed
+    CALL apoc.path.expandConfig(seed, {
+        relationshipFilter: '<PREREQ_OF',
+        minLevel: 1,
+        maxLevel: $prereq_depth,
+        uniqueness: 'RELATIONSHIP_PATH'
+    }) YIELD path
+    WITH path
+    ORDER BY length(path) DESC
+    LIMIT 1
+    // Paths are walked backward from the seed; flip them so
+    // chains read from the most basic prerequisite up
+    RETURN collect([n IN reverse(nodes(path)) | n.title]) AS longest
+}
+WITH collect({
+         title: seed.title,
+         definition: seed.definition,
+         difficulty: seed.difficulty,
+         depth: 0,
+         relation: 'seed',
+         seed_concept: seed.title
+     }) AS seeds,
+     reduce(acc = [], part IN collect(seed_prereqs) | acc + part) AS prereqs,
+     reduce(acc = [], part IN collect(seed_related) | acc + part) AS related_concepts,
+     collect({
+         seed: seedTitle,
+         titles: coalesce(head(longest), [seedTitle])
+     }) AS chains
+WITH chains, seeds + prereqs + related_concepts AS rows
+CALL {
+    // Keep each title's shallowest row (earliest on ties), then
+    // order by depth and cut to max_concepts before anything
+    // else is fetched for them
+    WITH rows
+    UNWIND range(0, size(rows) - 1) AS i
+    WITH rows[i] AS row, i
+    ORDER BY row.depth, i
+    WITH row.title AS title, head(collect(row)) AS best, min(i) AS first_seen
+    ORDER BY best.depth, first_seen
+    LIMIT $max_concepts
+    RETURN collect(best) AS concepts
+}
+WITH concepts, chains, [c IN concepts | c.title] AS candidates
+CALL {
+    WITH candidates
+    UNWIND candidates AS conceptTitle
+    MATCH (r:Resource)-[:EXPLAINS]->(c:Concept {title: conceptTitle})
+    WITH r, collect(DISTINCT c.title) AS explained
+    RETURN collect({
+        url: r.url,
+        resource_type: r.type,
+        concepts: explained
+    }) AS resources
+}
+CALL {
+    WITH candidates
+    UNWIND candidates AS conceptTitle
+    CALL {
+        // Stop after $max examples per concept instead of collecting
+        // all of them and slicing
+        WITH conceptTitle
+        MATCH (e:Example)-[:EXEMPLIFIES]->(:Concept {title: conceptTitle})
+        RETURN e
+        ORDER BY e.example_type
+        LIMIT $max
+    }
+    RETURN collect({
+        text: e.text,
+        example_type: e.example_type,
+        concept: conceptTitle,
+        source_url: e.source_url
+    }) AS examples
+}
+CALL {
+    WITH candidates
+    UNWIND candidates AS conceptTitle
+    MATCH (a:Concept {title: conceptTitle})-[:PREREQ_OF]->(b:Concept)
+    WHERE b.title IN candidates
+    RETURN collect({prereq: a.title, dependent: b.title}) AS edges
+}
+RETURN concepts, chains, resources, examples, edges
+"""
+
+
+@dataclass(slots=True)
 class RetrievedConcept:
     """A concept retrieved from the knowledge graph."""
     title: str
@@ -30,7 +183,7 @@ class RetrievedConcept:
     seed_concept: str  # Which seed concept this came from
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievedResource:
     """A resource that explains a concept."""
     url: str
@@ -41,7 +194,7 @@ class RetrievedResource:
     timecodes: Optional[dict] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievedExample:
     """An example that demonstrates a concept."""
     text: str
@@ -50,7 +203,7 @@ class RetrievedExample:
     source_url: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Subgraph:
     """A retrieved subgraph centered on seed concepts."""
     seed_concepts: list[str]
@@ -58,13 +211,37 @@ class Subgraph:
     resources: list[RetrievedResource]
     examples: list[RetrievedExample]
     prereq_chain: list[list[str]]  # Ordered paths for scaffolding
+    prereq_edges: list[tuple[str, str]] = field(default_factory=list)  # (prereq, dependent)
+    concept_title_tuple: tuple[str, ...] = field(init=False, repr=False, compare=False)
+    concept_title_set: frozenset[str] = field(init=False, repr=False, compare=False)
+    _dict_cache: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Titles are walked once here: the tuple keeps order and is hashable
+        # (cache keys), the set gives O(1) membership checks
+        self.concept_title_tuple = tuple(c.title for c in self.concepts)
+        self.concept_title_set = frozenset(self.concept_title_tuple)
     
     def concept_titles(self) -> list[str]:
         """Get all concept titles in the subgraph."""
-        return [c.title for c in self.concepts]
+        return list(self.concept_title_tuple)
     
     def to_dict(self) -> dict:
-        """Convert to dictionary for serialization."""
+        """
+        Convert to dictionary for serialization.
+        
+        Built once and reused, since a subgraph isn't modified after
+        retrieval; treat the returned dict as read-only.
+        """
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return self._dict_cache
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize to JSON (UTF-8 bytes) with orjson."""
+        return orjson.dumps(self.to_dict())
+    
+    def _build_dict(self) -> dict:
         return {
             "seed_concepts": self.seed_concepts,
             "concepts": [
@@ -110,10 +287,94 @@ class GraphRetriever:
         neo4j_uri: str = "bolt://localhost:7687",
         neo4j_user: str = "neo4j",
         neo4j_password: str = "erica_password_123",
+        neo4j_database: str = "neo4j",
+        cache_size: int = 256,
+        cache_ttl: Optional[float] = None,
+        ensure_indexes: bool = True,
     ):
+        """
+        Args:
+            neo4j_uri: Bolt URI of the Neo4j server
+            neo4j_user: Neo4j username
+            neo4j_password: Neo4j password
+            neo4j_database: Database every session runs against
+            cache_size: Number of expand_seeds results kept in an LRU
+                cache (0 disables caching)
+            cache_ttl: Seconds a cached expansion stays valid (None keeps
+                entries until evicted or clear_cache()). Set this when the
+                graph can be rebuilt by another process.
+            ensure_indexes: Create the Concept(title) / Resource(url)
+                indexes if they are missing
+        """
         self.driver = GraphDatabase.driver(
             neo4j_uri, auth=(neo4j_user, neo4j_password)
         )
+        # Naming the database up front spares the driver a home-database
+        # lookup every time a session is opened
+        self._database = neo4j_database
+        
+        # Repeated questions often map to the same seeds, so recent
+        # expansions are served from memory until they expire or
+        # clear_cache() is called
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._subgraph_cache: OrderedDict[tuple, tuple[float, Subgraph]] = OrderedDict()
+        self._toposort_cache: OrderedDict[tuple, tuple[float, list[str]]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        if ensure_indexes:
+            self.ensure_indexes()
+    
+    def ensure_indexes(self):
+        """Make sure title/url lookups are index seeks rather than label scans."""
+        try:
+            with self.session() as session:
+                for name, statement in SCHEMA_STATEMENTS.items():
+                    counters = session.run(statement).consume().counters
+                    if counters.constraints_added:
+                        print(f"Created index {name} (cold start: first queries may be slower)")
+        except Exception as e:
+            # Retrieval still works without them, just with label scans
+            print(f"Could not ensure Neo4j indexes: {e}")
+    
+    def warm(self):
+        """
+        Pull the retrieval subgraph into Neo4j's page cache.
+        
+        Call once at startup so the first user query doesn't pay for cold
+        disk reads. Uses apoc.warmup.run when the server has it (APOC 4.x)
+        and otherwise touches every Concept, its properties and its
+        relationships with one linear scan. Failures are reported, not
+        raised, so an unavailable server doesn't break startup.
+        """
+        try:
+            with self.session() as session:
+                has_warmup = session.run(
+                    "SHOW PROCEDURES YIELD name WHERE name = 'apoc.warmup.run' "
+                    "RETURN count(*) > 0 AS found"
+                ).single()["found"]
+                
+                if has_warmup:
+                    session.run("CALL apoc.warmup.run(true, true, true)").consume()
+                    return
+                
+                session.execute_read(lambda tx: tx.run("""
+                    MATCH (c:Concept)
+                    OPTIONAL MATCH (c)-[r:PREREQ_OF|IS_A|PART_OF|SIBLING|CONTRASTS_WITH|EXPLAINS|EXEMPLIFIES]-(x)
+                    RETURN count(c.title) + count(c.definition) + count(r) + count(x) AS touched
+                """).consume())
+        except Exception as e:
+            print(f"Could not warm Neo4j cache: {e}")
+    
+    def session(self):
+        """Open a session on the configured database."""
+        return self.driver.session(database=self._database)
+    
+    def _session_scope(self, session=None):
+        """Reuse the caller's session if given, otherwise open a short-lived one."""
+        if session is not None:
+            return nullcontext(session)
+        return self.session()
     
     def expand_seeds(
         self,
@@ -122,6 +383,7 @@ class GraphRetriever:
         related_depth: int = 1,
         max_concepts: int = 15,
         max_examples_per_concept: int = 2,
+        session=None,
     ) -> Subgraph:
         """
         Expand seed concepts into a subgraph.
@@ -132,273 +394,319 @@ class GraphRetriever:
             related_depth: How many hops on related edges (IS_A, PART_OF, etc.)
             max_concepts: Maximum total concepts to return
             max_examples_per_concept: Max examples per concept
+            session: Optional open session to run on (e.g. shared with
+                get_topological_order); a new one is opened if omitted
         
         Returns:
             Subgraph containing concepts, resources, examples, and prereq chains
         """
-        with self.driver.session() as session:
-            # 1. Get seed concepts with their properties
-            concepts = self._get_seed_concepts(session, seed_titles)
-            
-            # 2. Get prerequisites (for scaffolding)
-            prereqs = self._get_prerequisites(session, seed_titles, prereq_depth)
-            concepts.extend(prereqs)
-            
-            # 3. Get related concepts (siblings, is_a, part_of, contrasts)
-            related = self._get_related_concepts(session, seed_titles, related_depth)
-            concepts.extend(related)
-            
-            # 4. Deduplicate and limit concepts
-            concepts = self._deduplicate_concepts(concepts, max_concepts)
-            
-            # 5. Get prerequisite chains for ordering
-            prereq_chains = self._get_prereq_chains(session, seed_titles, prereq_depth)
-            
-            # 6. Get resources that explain these concepts
-            concept_titles = [c.title for c in concepts]
-            resources = self._get_resources(session, concept_titles)
-            
-            # 7. Get examples for these concepts
-            examples = self._get_examples(session, concept_titles, max_examples_per_concept)
-        
-        return Subgraph(
-            seed_concepts=seed_titles,
+        cache_key = (
+            tuple(seed_titles),
+            prereq_depth,
+            related_depth,
+            max_concepts,
+            max_examples_per_concept,
+        )
+        with self._cache_lock:
+            cached = self._subgraph_cache.get(cache_key)
+            if cached is not None:
+                stored_at, subgraph = cached
+                if self._is_fresh(stored_at):
+                    self._subgraph_cache.move_to_end(cache_key)
+                    return subgraph
+                del self._subgraph_cache[cache_key]
+        
+        with self._session_scope(session) as session:
+            # Seeds, prerequisites, related concepts, prereq chains, resources,
+            # examples and PREREQ_OF edges all come back from one fused query
+            concepts, prereq_chains, resources, examples, edges = self._expand_all(
+                session,
+                seed_titles,
+                prereq_depth,
+                related_depth,
+                max_concepts,
+                max_examples_per_concept,
+            )
+        
+        subgraph = Subgraph(
+            seed_concepts=list(seed_titles),
             concepts=concepts,
             resources=resources,
             examples=examples,
             prereq_chain=prereq_chains,
+            prereq_edges=edges,
         )
+        
+        if self._cache_size > 0:
+            with self._cache_lock:
+                self._subgraph_cache[cache_key] = (time.monotonic(), subgraph)
+                self._subgraph_cache.move_to_end(cache_key)
+                while len(self._subgraph_cache) > self._cache_size:
+                    self._subgraph_cache.popitem(last=False)
+        
+        return subgraph
     
-    def _get_seed_concepts(
-        self, session, titles: list[str]
-    ) -> list[RetrievedConcept]:
-        """Get the seed concepts with their properties."""
-        result = session.run("""
-            UNWIND $titles AS title
-            MATCH (c:Concept {title: title})
-            RETURN c.title AS title, 
-                   c.definition AS definition,
-                   c.difficulty AS difficulty
-        """, titles=titles)
+    def expand_seeds_many(
+        self,
+        seed_title_lists: list[list[str]],
+        max_workers: int = 4,
+        **kwargs,
+    ) -> list[Subgraph]:
+        """
+        Expand several independent seed sets concurrently.
+        
+        Each expansion runs on its own session from a thread pool, so Neo4j
+        executes the queries in parallel instead of one after another.
+        
+        Args:
+            seed_title_lists: One list of seed titles per expansion
+            max_workers: Maximum concurrent sessions
+            **kwargs: Passed through to expand_seeds
+        
+        Returns:
+            Subgraphs in the same order as seed_title_lists
+        """
+        if len(seed_title_lists) <= 1:
+            return [self.expand_seeds(titles, **kwargs) for titles in seed_title_lists]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self.expand_seeds, titles, **kwargs)
+                for titles in seed_title_lists
+            ]
+            return [future.result() for future in futures]
+    
+    def _expand_all(
+        self,
+        session,
+        seed_titles: list[str],
+        prereq_depth: int,
+        related_depth: int,
+        max_concepts: int,
+        max_examples: int,
+    ) -> tuple[
+        list[RetrievedConcept],
+        list[list[str]],
+        list[RetrievedResource],
+        list[RetrievedExample],
+        list[tuple[str, str]],
+    ]:
+        """
+        Run every expansion step as a subquery of a single Cypher statement.
         
-        return [
+        Seed nodes are looked up once; prerequisites, related concepts and
+        the longest prereq chain are correlated subqueries on each seed, so
+        the whole expansion costs one round-trip. Candidates are deduplicated
+        and limited inside the query, and resources, examples and the
+        PREREQ_OF edges used for topological ordering are only fetched for
+        the concepts that are kept.
+        
+        Returns:
+            Tuple of (concepts, prereq_chains, resources, examples, edges)
+        """
+        record = session.execute_read(
+            self._run_expansion,
+            seed_titles,
+            prereq_depth,
+            related_depth,
+            max_concepts,
+            max_examples,
+        )
+        
+        concepts = [
             RetrievedConcept(
-                title=record["title"],
-                definition=record["definition"] or "",
-                difficulty=record["difficulty"] or "unknown",
-                depth=0,
-                relation_to_seed="seed",
-                seed_concept=record["title"],
+                title=row["title"],
+                definition=row["definition"] or "",
+                difficulty=row["difficulty"] or "unknown",
+                depth=row["depth"],
+                relation_to_seed=row["relation"],
+                seed_concept=row["seed_concept"],
             )
-            for record in result
+            for row in record["concepts"]
         ]
-    
-    def _get_prerequisites(
-        self, session, seed_titles: list[str], depth: int
-    ) -> list[RetrievedConcept]:
-        """Get prerequisite concepts (traverse backward on PREREQ_OF)."""
-        result = session.run("""
-            UNWIND $titles AS seedTitle
-            MATCH (seed:Concept {title: seedTitle})
-            MATCH path = (prereq:Concept)-[:PREREQ_OF*1..""" + str(depth) + """]->(seed)
-            WITH seedTitle, prereq, length(path) AS dist
-            RETURN DISTINCT prereq.title AS title,
-                   prereq.definition AS definition,
-                   prereq.difficulty AS difficulty,
-                   min(dist) AS depth,
-                   seedTitle AS seed_concept
-            ORDER BY depth
-        """, titles=seed_titles)
-        
-        return [
-            RetrievedConcept(
-                title=record["title"],
-                definition=record["definition"] or "",
-                difficulty=record["difficulty"] or "unknown",
-                depth=record["depth"],
-                relation_to_seed="prerequisite",
-                seed_concept=record["seed_concept"],
+        concepts = self._deduplicate_concepts(concepts, max_concepts)
+        
+        # Seeds missing from the graph fall back to a single-node chain too
+        longest = {row["seed"]: row["titles"] for row in record["chains"]}
+        prereq_chains = [longest.get(seed, [seed]) for seed in seed_titles]
+        
+        # Only access properties that exist on Resource nodes (url, type)
+        # Other properties (title, page_numbers, start_time, end_time) may not exist
+        # Rows are grouped per Resource node (url is unique), so no dedup here
+        resources = [
+            RetrievedResource(
+                url=row["url"],
+                resource_type=row["resource_type"] or "unknown",
+                title=row["url"],  # Use URL as title since title property doesn't exist
+                concepts_explained=row["concepts"],
+                page_numbers=None,  # Property doesn't exist on Resource nodes
+                timecodes=None,  # Properties don't exist on Resource nodes
             )
-            for record in result
+            for row in record["resources"]
         ]
-    
-    def _get_related_concepts(
-        self, session, seed_titles: list[str], depth: int
-    ) -> list[RetrievedConcept]:
-        """Get related concepts via IS_A, PART_OF, SIBLING, CONTRASTS_WITH."""
-        result = session.run("""
-            UNWIND $titles AS seedTitle
-            MATCH (seed:Concept {title: seedTitle})
-            MATCH (seed)-[r:IS_A|PART_OF|SIBLING|CONTRASTS_WITH*1..""" + str(depth) + """]-(related:Concept)
-            WHERE related.title <> seedTitle
-            WITH seedTitle, related, type(r[0]) AS rel_type
-            RETURN DISTINCT related.title AS title,
-                   related.definition AS definition,
-                   related.difficulty AS difficulty,
-                   rel_type AS relation_type,
-                   seedTitle AS seed_concept
-        """, titles=seed_titles)
-        
-        return [
-            RetrievedConcept(
-                title=record["title"],
-                definition=record["definition"] or "",
-                difficulty=record["difficulty"] or "unknown",
-                depth=1,
-                relation_to_seed=record["relation_type"].lower(),
-                seed_concept=record["seed_concept"],
+        
+        examples = [
+            RetrievedExample(
+                text=row["text"],
+                example_type=row["example_type"] or "unknown",
+                concept=row["concept"],
+                source_url=row["source_url"] or "",
             )
-            for record in result
+            for row in record["examples"]
         ]
+        
+        edges = [
+            (row["prereq"], row["dependent"])
+            for row in record["edges"]
+        ]
+        
+        return concepts, prereq_chains, resources, examples, edges
+    
+    @staticmethod
+    def _run_expansion(
+        tx,
+        seed_titles: list[str],
+        prereq_depth: int,
+        related_depth: int,
+        max_concepts: int,
+        max_examples: int,
+    ):
+        """Transaction function for the fused expansion query."""
+        return tx.run(
+            EXPANSION_QUERY,
+            titles=seed_titles,
+            prereq_depth=prereq_depth,
+            related_depth=related_depth,
+            max_concepts=max_concepts,
+            max=max_examples,
+        ).single()
     
     def _deduplicate_concepts(
         self, concepts: list[RetrievedConcept], max_concepts: int
     ) -> list[RetrievedConcept]:
-        """Remove duplicates, keeping the one with lowest depth."""
+        """
+        Remove duplicates, keeping the one with lowest depth.
+        
+        The expansion query already does this; kept as a cheap safety net.
+        """
         seen = {}
         for c in concepts:
-            if c.title not in seen or c.depth < seen[c.title].depth:
+            current = seen.get(c.title)
+            if current is None or c.depth < current.depth:
                 seen[c.title] = c
         
-        # Sort by depth (seeds first, then prereqs, then related)
-        sorted_concepts = sorted(seen.values(), key=lambda x: x.depth)
-        return sorted_concepts[:max_concepts]
-    
-    def _get_prereq_chains(
-        self, session, seed_titles: list[str], depth: int
-    ) -> list[list[str]]:
-        """Get prerequisite chains for topological ordering."""
-        chains = []
-        
-        for seed in seed_titles:
-            result = session.run("""
-                MATCH path = (prereq:Concept)-[:PREREQ_OF*1..""" + str(depth) + """]->(seed:Concept {title: $seed})
-                WITH nodes(path) AS chain, path
-                RETURN [n IN chain | n.title] AS titles
-                ORDER BY length(path) DESC
-                LIMIT 1
-            """, seed=seed)
-            
-            record = result.single()
-            if record:
-                chains.append(record["titles"])
-            else:
-                chains.append([seed])
-        
-        return chains
-    
-    def _get_resources(
-        self, session, concept_titles: list[str]
-    ) -> list[RetrievedResource]:
-        """Get resources that explain the concepts."""
-        # Only access properties that exist on Resource nodes (url, type)
-        # Other properties (title, page_numbers, start_time, end_time) may not exist
-        result = session.run("""
-            UNWIND $titles AS conceptTitle
-            MATCH (r:Resource)-[:EXPLAINS]->(c:Concept {title: conceptTitle})
-            RETURN DISTINCT r.url AS url,
-                   r.type AS resource_type,
-                   collect(DISTINCT c.title) AS concepts
-        """, titles=concept_titles)
-        
-        resources = []
-        seen_urls = set()
-        
-        for record in result:
-            url = record["url"]
-            if url in seen_urls:
-                continue
-            seen_urls.add(url)
-            
-            resources.append(RetrievedResource(
-                url=url,
-                resource_type=record["resource_type"] or "unknown",
-                title=url,  # Use URL as title since title property doesn't exist
-                concepts_explained=record["concepts"],
-                page_numbers=None,  # Property doesn't exist on Resource nodes
-                timecodes=None,  # Properties don't exist on Resource nodes
-            ))
-        
-        return resources
+        # Lowest depth first (seeds, then prereqs, then related); nsmallest
+        # keeps ties in insertion order like a stable sort would
+        return heapq.nsmallest(max_concepts, seen.values(), key=lambda x: x.depth)
     
-    def _get_examples(
-        self, session, concept_titles: list[str], max_per_concept: int
-    ) -> list[RetrievedExample]:
-        """Get examples that demonstrate the concepts."""
-        result = session.run("""
-            UNWIND $titles AS conceptTitle
-            MATCH (e:Example)-[:EXEMPLIFIES]->(c:Concept {title: conceptTitle})
-            WITH c.title AS concept, e
-            ORDER BY e.example_type
-            WITH concept, collect(e)[0..$max] AS examples
-            UNWIND examples AS e
-            RETURN e.text AS text,
-                   e.example_type AS example_type,
-                   concept,
-                   e.source_url AS source_url
-        """, titles=concept_titles, max=max_per_concept)
-        
-        return [
-            RetrievedExample(
-                text=record["text"],
-                example_type=record["example_type"] or "unknown",
-                concept=record["concept"],
-                source_url=record["source_url"] or "",
-            )
-            for record in result
-        ]
-    
-    def get_topological_order(self, concepts: list[RetrievedConcept]) -> list[str]:
+    def get_topological_order(
+        self,
+        concepts: list[RetrievedConcept],
+        edges: Optional[list[tuple[str, str]]] = None,
+        session=None,
+    ) -> list[str]:
         """
         Sort concepts in topological order based on PREREQ_OF relationships.
         Returns concepts ordered from foundational to advanced.
+        
+        Pass a subgraph's prereq_edges to sort purely in memory; without
+        them the edges are looked up in Neo4j (reusing session if given)
+        and the resulting ordering is cached per concept list, subject to
+        the same TTL and clear_cache() as expansions.
         """
-        titles = [c.title for c in concepts]
-        
-        with self.driver.session() as session:
-            # Get all PREREQ_OF edges between our concepts
-            result = session.run("""
-                MATCH (a:Concept)-[:PREREQ_OF]->(b:Concept)
-                WHERE a.title IN $titles AND b.title IN $titles
-                RETURN a.title AS prereq, b.title AS dependent
-            """, titles=titles)
-            
-            # Build adjacency list
-            edges = [(r["prereq"], r["dependent"]) for r in result]
-        
-        # Kahn's algorithm for topological sort
-        from collections import defaultdict, deque
-        
-        in_degree = defaultdict(int)
-        graph = defaultdict(list)
-        
-        for title in titles:
-            in_degree[title] = 0
-        
-        for prereq, dependent in edges:
-            graph[prereq].append(dependent)
-            in_degree[dependent] += 1
-        
-        # Start with nodes that have no prerequisites
-        queue = deque([t for t in titles if in_degree[t] == 0])
-        result = []
-        
-        while queue:
-            node = queue.popleft()
-            result.append(node)
-            
-            for neighbor in graph[node]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
-        
-        # Add any remaining nodes (in case of cycles)
-        for title in titles:
-            if title not in result:
-                result.append(title)
-        
-        return result
+        titles = tuple(c.title for c in concepts)
+        
+        # With edges in hand, Kahn's algorithm on a handful of nodes is
+        # cheaper than building and hashing a cache key for them
+        if edges is not None:
+            return topological_sort(titles, edges)
+        
+        with self._cache_lock:
+            cached = self._toposort_cache.get(titles)
+            if cached is not None:
+                stored_at, order = cached
+                if self._is_fresh(stored_at):
+                    self._toposort_cache.move_to_end(titles)
+                    return order
+                del self._toposort_cache[titles]
+        
+        with self._session_scope(session) as session:
+            edges = session.execute_read(self._fetch_prereq_edges, list(titles))
+        
+        order = topological_sort(titles, edges)
+        
+        if self._cache_size > 0:
+            with self._cache_lock:
+                self._toposort_cache[titles] = (time.monotonic(), order)
+                while len(self._toposort_cache) > TOPOSORT_CACHE_SIZE:
+                    self._toposort_cache.popitem(last=False)
+        
+        return order
+    
+    @staticmethod
+    def _fetch_prereq_edges(tx, titles: list[str]) -> list[tuple[str, str]]:
+        """Get all PREREQ_OF edges between the given concepts."""
+        result = tx.run("""
+            MATCH (a:Concept)-[:PREREQ_OF]->(b:Concept)
+            WHERE a.title IN $titles AND b.title IN $titles
+            RETURN a.title AS prereq, b.title AS dependent
+        """, titles=titles)
+        return [(r["prereq"], r["dependent"]) for r in result]
+    
+    def _is_fresh(self, stored_at: float) -> bool:
+        """Whether a cache entry stored at `stored_at` is still within the TTL."""
+        return self._cache_ttl is None or time.monotonic() - stored_at < self._cache_ttl
+    
+    def clear_cache(self):
+        """Drop cached expansions (call after writing to the graph)."""
+        with self._cache_lock:
+            self._subgraph_cache.clear()
+            self._toposort_cache.clear()
     
     def close(self):
         """Close the Neo4j driver."""
-        self.driver.close()
\ No newline at end of file
+        self.driver.close()
+
+
+def topological_sort(
+    titles: Sequence[str], edges: Iterable[tuple[str, str]]
+) -> list[str]:
+    """
+    Order titles so every prerequisite comes before its dependents.
+    
+    Uses Kahn's algorithm over integer ids; titles caught in a cycle are
+    appended at the end in their original order. Edges touching titles
+    outside the list are ignored.
+    """
+    n = len(titles)
+    title_to_id = {title: i for i, title in enumerate(titles)}
+    in_degree = [0] * n
+    adjacency = [[] for _ in range(n)]
+    
+    for prereq, dependent in edges:
+        src = title_to_id.get(prereq)
+        dst = title_to_id.get(dependent)
+        if src is None or dst is None:
+            continue
+        adjacency[src].append(dst)
+        in_degree[dst] += 1
+    
+    # Start with nodes that have no prerequisites
+    queue = deque(i for i in range(n) if in_degree[i] == 0)
+    placed = [False] * n
+    order = []
+    
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        placed[node] = True
+        
+        for neighbor in adjacency[node]:
+            in_degree[neighbor] -= 1
+            if in_degree[neighbor] == 0:
+                queue.append(neighbor)
+    
+    # Add any remaining nodes (in case of cycles)
+    order.extend(i for i in range(n) if not placed[i])
+    
+    return [titles[i] for i in order]
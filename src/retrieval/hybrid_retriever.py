@@ -18,11 +18,13 @@ Usage:
 from dataclasses import dataclass
 from typing import Optional
 
+import orjson
+
 from .concept_embeddings import ConceptEmbedder
 from .graph_retriever import GraphRetriever, Subgraph
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     """Complete retrieval result for answer generation."""
     query: str
@@ -41,6 +43,16 @@ class RetrievalResult:
             f"Examples: {len(self.subgraph.examples)}\n"
             f"Order: {' → '.join(self.ordered_concepts[:5])}..."
         )
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize the full result to JSON (UTF-8 bytes) with orjson."""
+        return orjson.dumps({
+            "query": self.query,
+            "semantic_matches": self.semantic_matches,
+            "seed_concepts": self.seed_concepts,
+            "subgraph": self.subgraph.to_dict(),
+            "ordered_concepts": self.ordered_concepts,
+        })
 
 
 class HybridRetriever:
@@ -56,6 +68,9 @@ class HybridRetriever:
         neo4j_uri: str = "bolt://localhost:7687",
         neo4j_user: str = "neo4j",
         neo4j_password: str = "erica_password_123",
+        neo4j_database: str = "neo4j",
+        graph_cache_ttl: Optional[float] = None,
+        warm: bool = False,
     ):
         # Initialize components
         self.embedder = ConceptEmbedder(
@@ -67,13 +82,20 @@ class HybridRetriever:
             neo4j_uri=neo4j_uri,
             neo4j_user=neo4j_user,
             neo4j_password=neo4j_password,
+            neo4j_database=neo4j_database,
+            cache_ttl=graph_cache_ttl,
         )
+        
+        # Optionally take the Neo4j cold-cache hit now instead of on the
+        # first user query
+        if warm:
+            self.graph_retriever.warm()
     
     def retrieve(
         self,
         query: str,
         top_k_semantic: int = 5,
-        min_semantic_score: float = 0.4,
+        min_semantic_score: float = 0.25,
         prereq_depth: int = 2,
         related_depth: int = 1,
         max_concepts: int = 15,
@@ -106,19 +128,7 @@ class HybridRetriever:
         
         if not seed_concepts:
             # Fallback: if no semantic matches, return empty result
-            return RetrievalResult(
-                query=query,
-                semantic_matches=[],
-                seed_concepts=[],
-                subgraph=Subgraph(
-                    seed_concepts=[],
-                    concepts=[],
-                    resources=[],
-                    examples=[],
-                    prereq_chain=[],
-                ),
-                ordered_concepts=[],
-            )
+            return self._empty_result(query)
         
         # Step 3: Expand seeds via graph traversal
         subgraph = self.graph_retriever.expand_seeds(
@@ -130,7 +140,10 @@ class HybridRetriever:
         )
         
         # Step 4: Get topological order for explanation scaffolding
-        ordered_concepts = self.graph_retriever.get_topological_order(subgraph.concepts)
+        # (edges came back with the subgraph, so this stays in memory)
+        ordered_concepts = self.graph_retriever.get_topological_order(
+            subgraph.concepts, subgraph.prereq_edges
+        )
         
         return RetrievalResult(
             query=query,
@@ -140,6 +153,70 @@ class HybridRetriever:
             ordered_concepts=ordered_concepts,
         )
     
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        top_k_semantic: int = 5,
+        min_semantic_score: float = 0.25,
+        prereq_depth: int = 2,
+        related_depth: int = 1,
+        max_concepts: int = 15,
+        max_examples_per_concept: int = 2,
+        max_workers: int = 4,
+    ) -> list[RetrievalResult]:
+        """
+        Retrieve subgraphs for several queries at once.
+        
+        Same per-query semantics as retrieve(), but all queries are embedded
+        and searched in one batch and the graph expansions run concurrently
+        on separate Neo4j sessions.
+        
+        Args:
+            queries: User questions
+            max_workers: Maximum concurrent graph expansions
+            (remaining arguments as in retrieve())
+        
+        Returns:
+            One RetrievalResult per query, in input order
+        """
+        all_matches = self.embedder.search_batch(
+            queries,
+            top_k=top_k_semantic,
+            min_score=min_semantic_score,
+        )
+        all_seeds = [[match["title"] for match in matches] for matches in all_matches]
+        
+        # Only queries with semantic matches need a graph expansion
+        expand_indices = [i for i, seeds in enumerate(all_seeds) if seeds]
+        subgraphs = self.graph_retriever.expand_seeds_many(
+            [all_seeds[i] for i in expand_indices],
+            max_workers=max_workers,
+            prereq_depth=prereq_depth,
+            related_depth=related_depth,
+            max_concepts=max_concepts,
+            max_examples_per_concept=max_examples_per_concept,
+        )
+        subgraph_by_index = dict(zip(expand_indices, subgraphs))
+        
+        results = []
+        for i, query in enumerate(queries):
+            subgraph = subgraph_by_index.get(i)
+            if subgraph is None:
+                results.append(self._empty_result(query))
+                continue
+            
+            results.append(RetrievalResult(
+                query=query,
+                semantic_matches=all_matches[i],
+                seed_concepts=all_seeds[i],
+                subgraph=subgraph,
+                ordered_concepts=self.graph_retriever.get_topological_order(
+                    subgraph.concepts, subgraph.prereq_edges
+                ),
+            ))
+        
+        return results
+    
     def retrieve_with_explicit_concepts(
         self,
         query: str,
@@ -156,14 +233,16 @@ class HybridRetriever:
         semantic_matches = self.embedder.search(
             query=query,
             top_k=kwargs.get("top_k_semantic", 3),
-            min_score=kwargs.get("min_semantic_score", 0.4),
+            min_score=kwargs.get("min_semantic_score", 0.25),
         )
         
         # Union of explicit + semantic, explicit first
         seed_concepts = list(explicit_concepts)
+        seed_set = set(seed_concepts)
         for match in semantic_matches:
-            if match["title"] not in seed_concepts:
+            if match["title"] not in seed_set:
                 seed_concepts.append(match["title"])
+                seed_set.add(match["title"])
         
         # Expand via graph
         subgraph = self.graph_retriever.expand_seeds(
@@ -174,7 +253,9 @@ class HybridRetriever:
             max_examples_per_concept=kwargs.get("max_examples_per_concept", 2),
         )
         
-        ordered_concepts = self.graph_retriever.get_topological_order(subgraph.concepts)
+        ordered_concepts = self.graph_retriever.get_topological_order(
+            subgraph.concepts, subgraph.prereq_edges
+        )
         
         return RetrievalResult(
             query=query,
@@ -184,6 +265,23 @@ class HybridRetriever:
             ordered_concepts=ordered_concepts,
         )
     
+    @staticmethod
+    def _empty_result(query: str) -> RetrievalResult:
+        """Result for a query with no semantic matches."""
+        return RetrievalResult(
+            query=query,
+            semantic_matches=[],
+            seed_concepts=[],
+            subgraph=Subgraph(
+                seed_concepts=[],
+                concepts=[],
+                resources=[],
+                examples=[],
+                prereq_chain=[],
+            ),
+            ordered_concepts=[],
+        )
+    
     def close(self):
         """Close all connections."""
         self.embedder.close()